@@ -0,0 +1,216 @@
+"""Compound action executor that batches browser steps to cut driver round trips."""
+from __future__ import annotations
+
+import asyncio
+import json
+import os
+import time
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from playwright.async_api import Page
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+from .models import BrowseAction, FormField
+
+# Steps of the same group that appear back to back are executed together.
+_BATCH_FILL = {"fill", "select"}
+_CONCURRENT_WAIT = {"wait", "wait_any", "network_idle"}
+_CONCURRENT_ASSERT = {"assert"}
+ASSERT_TIMEOUT = int(1000 * float(os.environ.get("VDI_ASSERT_TIMEOUT_SECONDS", "5")))
+
+# Sets values in order in one evaluate call and returns how many items it applied. It
+# stops at the first item that is not a visible, enabled text-like control (hidden,
+# file, checkbox, number, date, ...) so the caller can hand that one to Playwright's
+# own fill/select_option and resume after it, keeping the original field order.
+_FILL_SCRIPT = """
+(items) => {
+  const textTypes = new Set(["text", "password", "email", "search", "tel", "url"]);
+  const visible = (el) => el.getClientRects().length > 0 && getComputedStyle(el).visibility !== "hidden";
+  for (let i = 0; i < items.length; i++) {
+    const [selector, value, kind] = items[i];
+    try {
+      const el = document.querySelector(selector);
+      let proto = null;
+      if (kind === "fill" && el instanceof HTMLInputElement && textTypes.has(el.type)) {
+        proto = HTMLInputElement.prototype;
+      } else if (kind === "fill" && el instanceof HTMLTextAreaElement) {
+        proto = HTMLTextAreaElement.prototype;
+      } else if (kind === "select" && el instanceof HTMLSelectElement && !el.multiple
+                 && [...el.options].some((o) => o.value === value)) {
+        proto = HTMLSelectElement.prototype;
+      }
+      if (!proto || el.disabled || el.readOnly || !visible(el)) {
+        return i;
+      }
+      Object.getOwnPropertyDescriptor(proto, "value").set.call(el, value);
+      el.dispatchEvent(new Event("input", { bubbles: true }));
+      el.dispatchEvent(new Event("change", { bubbles: true }));
+    } catch (e) {
+      return i;
+    }
+  }
+  return items.length;
+}
+"""
+
+
+class ActionAssertionError(Exception):
+    """Raised when an ``assert_selector`` step does not hold."""
+
+
+@dataclass
+class Step:
+    kind: str
+    index: int
+    selector: Optional[str] = None
+    value: Optional[str] = None
+    selectors: List[str] = field(default_factory=list)
+
+
+def steps_from_actions(actions: Sequence[BrowseAction], offset: int = 0) -> List[Step]:
+    steps: List[Step] = []
+    for idx, action in enumerate(actions, start=offset):
+        if action.fill_selector:
+            steps.append(Step("fill", idx, action.fill_selector, action.value))
+        if action.select_selector:
+            steps.append(Step("select", idx, action.select_selector, action.value))
+        if action.check_selector:
+            steps.append(Step("check", idx, action.check_selector))
+        if action.uncheck_selector:
+            steps.append(Step("uncheck", idx, action.uncheck_selector))
+        if action.click_selector:
+            steps.append(Step("click", idx, action.click_selector))
+        if action.wait_for:
+            steps.append(Step("wait", idx, action.wait_for))
+        if action.wait_for_any:
+            steps.append(Step("wait_any", idx, selectors=list(action.wait_for_any)))
+        if action.wait_for_network_idle:
+            steps.append(Step("network_idle", idx))
+        if action.assert_selector:
+            steps.append(Step("assert", idx, action.assert_selector, action.assert_text))
+    return steps
+
+
+def steps_from_form(fields: Sequence[FormField]) -> List[Step]:
+    steps: List[Step] = []
+    for idx, form_field in enumerate(fields):
+        if form_field.type == "checkbox":
+            steps.append(Step("check", idx, form_field.selector))
+        elif form_field.type == "select":
+            steps.append(Step("select", idx, form_field.selector, form_field.value))
+        else:
+            steps.append(Step("fill", idx, form_field.selector, form_field.value))
+    return steps
+
+
+def _group_of(kind: str) -> Optional[str]:
+    if kind in _BATCH_FILL:
+        return "fill"
+    if kind in _CONCURRENT_WAIT:
+        return "wait"
+    if kind in _CONCURRENT_ASSERT:
+        return "assert"
+    return None
+
+
+def plan_batches(steps: Sequence[Step]) -> List[Tuple[str, List[Step]]]:
+    """Group consecutive steps that can run in a single batch; order between batches is kept."""
+    batches: List[Tuple[str, List[Step]]] = []
+    for step in steps:
+        group = _group_of(step.kind)
+        if group and batches and batches[-1][0] == group:
+            batches[-1][1].append(step)
+        else:
+            batches.append((group or step.kind, [step]))
+    return batches
+
+
+class ActionExecutor:
+    def __init__(self, page: Page) -> None:
+        self.page = page
+        self.timings: List[Dict[str, object]] = []
+
+    async def run(self, steps: Sequence[Step], label: str = "actions") -> None:
+        for kind, batch in plan_batches(steps):
+            started = time.perf_counter()
+            if kind == "fill":
+                await self._fill(batch)
+            elif kind in ("wait", "assert"):
+                await self._concurrently(batch)
+            else:
+                await self._single(batch[0])
+            self.timings.append(
+                {
+                    "source": label,
+                    "kind": kind,
+                    "steps": [step.index for step in batch],
+                    "ms": round((time.perf_counter() - started) * 1000, 2),
+                }
+            )
+
+    async def _concurrently(self, batch: List[Step]) -> None:
+        """Run independent steps together; the first failure cancels the rest before the page closes."""
+        tasks = [asyncio.ensure_future(self._single(step)) for step in batch]
+        try:
+            await asyncio.wait(tasks, return_when=asyncio.FIRST_EXCEPTION)
+        finally:
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+        for task in tasks:
+            if not task.cancelled() and task.exception() is not None:
+                raise task.exception()
+
+    async def _fill(self, batch: List[Step]) -> None:
+        pos = 0
+        while pos < len(batch):
+            items = [[step.selector, step.value, step.kind] for step in batch[pos:]]
+            pos += await self.page.evaluate(_FILL_SCRIPT, items)
+            if pos < len(batch):
+                await self._single(batch[pos])
+                pos += 1
+
+    async def _single(self, step: Step) -> None:
+        page = self.page
+        if step.kind == "fill":
+            await page.fill(step.selector, step.value or "")
+        elif step.kind == "select":
+            await page.select_option(step.selector, step.value)
+        elif step.kind == "check":
+            await page.check(step.selector)
+        elif step.kind == "uncheck":
+            await page.uncheck(step.selector)
+        elif step.kind == "click":
+            await page.click(step.selector)
+        elif step.kind == "wait":
+            await page.wait_for_selector(step.selector)
+        elif step.kind == "wait_any":
+            locator = page.locator(step.selectors[0])
+            for selector in step.selectors[1:]:
+                locator = locator.or_(page.locator(selector))
+            await locator.first.wait_for()
+        elif step.kind == "network_idle":
+            await page.wait_for_load_state("networkidle")
+        elif step.kind == "assert":
+            await self._assert(step)
+        else:
+            raise ValueError(f"unknown action step: {step.kind}")
+
+    async def _assert(self, step: Step) -> None:
+        locator = self.page.locator(step.selector).first
+        try:
+            await locator.wait_for(state="visible", timeout=ASSERT_TIMEOUT)
+            text = await locator.inner_text(timeout=ASSERT_TIMEOUT) if step.value is not None else None
+        except PlaywrightTimeoutError:
+            raise ActionAssertionError(f"assert_failed: {step.selector} not visible")
+        if text is not None and step.value not in text:
+            raise ActionAssertionError(f"assert_failed: {step.selector} missing text")
+
+    def telemetry(self) -> Dict[str, str]:
+        total = sum(float(entry["ms"]) for entry in self.timings)
+        return {
+            "action_batches": str(len(self.timings)),
+            "actions_ms": f"{total:.2f}",
+            "action_timings": json.dumps(self.timings, separators=(",", ":")),
+        }
@@ -0,0 +1,107 @@
+"""Standalone browser broker owning the Chromium fleet shared by API workers (see README)."""
+from __future__ import annotations
+
+import asyncio
+import ipaddress
+import logging
+import os
+import signal
+from typing import List, Optional, Set
+
+from playwright.async_api import Browser, Playwright, async_playwright
+
+from .browser import CHROMIUM_ARGS
+
+logger = logging.getLogger("unison-agent-vdi.broker")
+
+BROKER_HOST = os.environ.get("VDI_BROKER_HOST", "127.0.0.1")
+BROKER_PORT = int(os.environ.get("VDI_BROKER_PORT", "9222"))
+BROKER_BROWSERS = int(os.environ.get("VDI_BROKER_BROWSERS", "1"))
+RESTART_DELAY_SECONDS = 1.0
+RESTART_MAX_DELAY_SECONDS = 30.0
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def broker_args(host: str, port: int) -> List[str]:
+    return CHROMIUM_ARGS + [f"--remote-debugging-address={host}", f"--remote-debugging-port={port}"]
+
+
+class BrowserBroker:
+    def __init__(self, host: str = BROKER_HOST, port: int = BROKER_PORT, size: int = BROKER_BROWSERS) -> None:
+        if not _is_loopback(host):
+            raise ValueError(f"broker host must be a loopback address, got {host!r}")
+        self.host = host
+        self.ports = [port + offset for offset in range(max(size, 1))]
+        self._playwright: Optional[Playwright] = None
+        self._browsers: List[Optional[Browser]] = [None] * len(self.ports)
+        self._stopping = asyncio.Event()
+        self._restarts: Set[asyncio.Task] = set()
+
+    def endpoints(self) -> List[str]:
+        return [f"http://{self.host}:{port}" for port in self.ports]
+
+    async def _launch(self, slot: int) -> None:
+        browser = await self._playwright.chromium.launch(headless=True, args=broker_args(self.host, self.ports[slot]))
+        browser.on("disconnected", lambda _: self._on_disconnect(slot))
+        self._browsers[slot] = browser
+        logger.info("browser %d ready at %s", slot, self.endpoints()[slot])
+
+    def _on_disconnect(self, slot: int) -> None:
+        self._browsers[slot] = None
+        if not self._stopping.is_set():
+            logger.warning("browser %d exited; restarting", slot)
+            task = asyncio.get_running_loop().create_task(self._restart(slot))
+            self._restarts.add(task)
+            task.add_done_callback(self._restarts.discard)
+
+    async def _restart(self, slot: int) -> None:
+        delay = RESTART_DELAY_SECONDS
+        while not self._stopping.is_set():
+            await asyncio.sleep(delay)
+            if self._stopping.is_set():
+                return
+            try:
+                await self._launch(slot)
+                return
+            except Exception:
+                delay = min(delay * 2, RESTART_MAX_DELAY_SECONDS)
+                logger.exception("browser %d restart failed; retrying in %.1fs", slot, delay)
+
+    async def run(self) -> None:
+        self._playwright = await async_playwright().start()
+        try:
+            for slot in range(len(self.ports)):
+                await self._launch(slot)
+            await self._stopping.wait()
+        finally:
+            self._stopping.set()
+            for task in list(self._restarts):
+                task.cancel()
+            for browser in self._browsers:
+                if browser:
+                    await browser.close()
+            await self._playwright.stop()
+
+    def stop(self) -> None:
+        self._stopping.set()
+
+
+async def _main() -> None:
+    broker = BrowserBroker()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, broker.stop)
+    await broker.run()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    asyncio.run(_main())
@@ -8,19 +8,33 @@ from typing import List, Optional
 
 from playwright.async_api import async_playwright, Browser, BrowserContext, Page
 
-from .models import BrowseAction, BrowseRequest, DownloadRequest, FormField, FormSubmitRequest, TaskResult
+from .actions import ActionAssertionError, ActionExecutor, steps_from_actions, steps_from_form
+from .models import BrowseRequest, DownloadRequest, FormSubmitRequest, TaskResult
+from .session_state import SessionState
 
 DEFAULT_TIMEOUT = int(1000 * float(int(os.environ.get("VDI_ACTION_TIMEOUT_SECONDS", "15"))))
+CHROMIUM_ARGS = [
+    "--no-sandbox",
+    "--disable-dev-shm-usage",
+    "--disable-gpu",
+    "--disable-setuid-sandbox",
+]
 
 
 class BrowserRunner:
-    async def browse(self, request: BrowseRequest, workspace: Path) -> TaskResult:
+    async def browse(
+        self, request: BrowseRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         raise NotImplementedError
 
-    async def submit_form(self, request: FormSubmitRequest, workspace: Path) -> TaskResult:
+    async def submit_form(
+        self, request: FormSubmitRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         raise NotImplementedError
 
-    async def download(self, request: DownloadRequest, workspace: Path) -> TaskResult:
+    async def download(
+        self, request: DownloadRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         raise NotImplementedError
 
     async def close(self) -> None:
@@ -30,16 +44,31 @@ class BrowserRunner:
 class FakeBrowserRunner(BrowserRunner):
     """Lightweight stub used in tests or constrained environments."""
 
-    async def browse(self, request: BrowseRequest, workspace: Path) -> TaskResult:
+    @staticmethod
+    def _export_session(session: Optional[SessionState]) -> None:
+        # Mirror the Playwright runner, which always exports the context's storage state.
+        if session is not None and session.storage_state is None:
+            session.storage_state = {"cookies": [], "origins": []}
+
+    async def browse(
+        self, request: BrowseRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         workspace.mkdir(parents=True, exist_ok=True)
+        self._export_session(session)
         return TaskResult(status="ok", detail="fake-browser", telemetry={"url": str(request.url)})
 
-    async def submit_form(self, request: FormSubmitRequest, workspace: Path) -> TaskResult:
+    async def submit_form(
+        self, request: FormSubmitRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         workspace.mkdir(parents=True, exist_ok=True)
+        self._export_session(session)
         return TaskResult(status="ok", detail="fake-form-submit", telemetry={"fields": str(len(request.form))})
 
-    async def download(self, request: DownloadRequest, workspace: Path) -> TaskResult:
+    async def download(
+        self, request: DownloadRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         workspace.mkdir(parents=True, exist_ok=True)
+        self._export_session(session)
         dummy = workspace / (request.filename or "placeholder.txt")
         dummy.write_text("placeholder")
         return TaskResult(
@@ -63,80 +92,89 @@ class PlaywrightBrowserRunner(BrowserRunner):
         async with self._lock:
             if self._browser is None:
                 self._playwright = await async_playwright().start()
-                self._browser = await self._playwright.chromium.launch(
-                    headless=True,
-                    args=[
-                        "--no-sandbox",
-                        "--disable-dev-shm-usage",
-                        "--disable-gpu",
-                        "--disable-setuid-sandbox",
-                    ],
-                )
+                self._browser = await self._playwright.chromium.launch(headless=True, args=CHROMIUM_ARGS)
             return self._browser
 
-    async def _context(self, request: BrowseRequest, workspace: Path) -> BrowserContext:
+    async def _context(
+        self, request: BrowseRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> BrowserContext:
         browser = await self._ensure_browser()
         workspace.mkdir(parents=True, exist_ok=True)
-        context = await browser.new_context(accept_downloads=True, base_url=None, extra_http_headers=request.headers)
+        storage_state = session.storage_state if session and session.storage_state else None
+        context = await browser.new_context(
+            accept_downloads=True, base_url=None, extra_http_headers=request.headers, storage_state=storage_state
+        )
         context.set_default_timeout(DEFAULT_TIMEOUT)
         await context.tracing.start(screenshots=False, snapshots=False)
         await context.set_default_navigation_timeout(DEFAULT_TIMEOUT)
         return context
 
-    async def _apply_actions(self, page: Page, actions: List[BrowseAction]) -> None:
-        for action in actions:
-            if action.click_selector:
-                await page.click(action.click_selector)
-            if action.wait_for:
-                await page.wait_for_selector(action.wait_for)
-
-    async def browse(self, request: BrowseRequest, workspace: Path) -> TaskResult:
+    async def _release(
+        self, page: Optional[Page], context: Optional[BrowserContext], session: Optional[SessionState]
+    ) -> None:
+        if context and session is not None:
+            try:
+                session.storage_state = await context.storage_state()
+            except Exception:
+                pass
+        if page:
+            await page.close()
+        if context:
+            await context.close()
+
+    async def browse(
+        self, request: BrowseRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         context: Optional[BrowserContext] = None
         page: Optional[Page] = None
         try:
-            context = await self._context(request, workspace)
+            context = await self._context(request, workspace, session)
             page = await context.new_page()
             await page.goto(str(request.url))
             if request.wait_for:
                 await page.wait_for_selector(request.wait_for)
-            await self._apply_actions(page, request.actions)
-            return TaskResult(status="ok", telemetry={"url": str(request.url)})
+            executor = ActionExecutor(page)
+            telemetry = {"url": str(request.url)}
+            try:
+                await executor.run(steps_from_actions(request.actions))
+            except ActionAssertionError as exc:
+                return TaskResult(status="failed", detail=str(exc), telemetry={**telemetry, **executor.telemetry()})
+            return TaskResult(status="ok", telemetry={**telemetry, **executor.telemetry()})
         finally:
-            if page:
-                await page.close()
-            if context:
-                await context.close()
+            await self._release(page, context, session)
 
-    async def submit_form(self, request: FormSubmitRequest, workspace: Path) -> TaskResult:
+    async def submit_form(
+        self, request: FormSubmitRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         context: Optional[BrowserContext] = None
         page: Optional[Page] = None
         try:
-            context = await self._context(request, workspace)
+            context = await self._context(request, workspace, session)
             page = await context.new_page()
             await page.goto(str(request.url))
-            for field in request.form:
-                if field.type == "checkbox":
-                    await page.check(field.selector)
-                else:
-                    await page.fill(field.selector, field.value)
-            if request.submit_selector:
-                await page.click(request.submit_selector)
-            if request.wait_for:
-                await page.wait_for_selector(request.wait_for)
-            await self._apply_actions(page, request.actions)
-            return TaskResult(status="ok", telemetry={"url": str(request.url), "fields": str(len(request.form))})
+            executor = ActionExecutor(page)
+            telemetry = {"url": str(request.url), "fields": str(len(request.form))}
+            try:
+                await executor.run(steps_from_form(request.form), label="form")
+                if request.submit_selector:
+                    await page.click(request.submit_selector)
+                if request.wait_for:
+                    await page.wait_for_selector(request.wait_for)
+                await executor.run(steps_from_actions(request.actions))
+            except ActionAssertionError as exc:
+                return TaskResult(status="failed", detail=str(exc), telemetry={**telemetry, **executor.telemetry()})
+            return TaskResult(status="ok", telemetry={**telemetry, **executor.telemetry()})
         finally:
-            if page:
-                await page.close()
-            if context:
-                await context.close()
+            await self._release(page, context, session)
 
-    async def download(self, request: DownloadRequest, workspace: Path) -> TaskResult:
+    async def download(
+        self, request: DownloadRequest, workspace: Path, session: Optional[SessionState] = None
+    ) -> TaskResult:
         context: Optional[BrowserContext] = None
         page: Optional[Page] = None
         downloads: List[str] = []
         try:
-            context = await self._context(request, workspace)
+            context = await self._context(request, workspace, session)
             page = await context.new_page()
             await page.goto(str(request.url))
             if request.wait_for:
@@ -148,13 +186,44 @@ class PlaywrightBrowserRunner(BrowserRunner):
             downloads.append(str(target))
             return TaskResult(status="ok", telemetry={"url": str(request.url)}, artifacts=downloads)
         finally:
-            if page:
-                await page.close()
-            if context:
-                await context.close()
+            await self._release(page, context, session)
 
     async def close(self) -> None:
         if self._browser:
             await self._browser.close()
         if self._playwright:
             await self._playwright.stop()
+
+
+def broker_endpoints(raw: Optional[str]) -> List[str]:
+    return [item.strip() for item in (raw or "").split(",") if item.strip()]
+
+
+class RemoteBrowserRunner(PlaywrightBrowserRunner):
+    """Runs tasks on a shared Chromium owned by the browser broker, connecting over CDP."""
+
+    def __init__(self, endpoints: List[str]) -> None:
+        super().__init__()
+        if not endpoints:
+            raise ValueError("browser broker endpoint required")
+        # Spread workers across the broker's browsers; each worker sticks to one.
+        self._endpoint = endpoints[os.getpid() % len(endpoints)]
+
+    async def _ensure_browser(self) -> Browser:
+        async with self._lock:
+            if self._browser is not None and not self._browser.is_connected():
+                self._browser = None
+            if self._browser is None:
+                if self._playwright is None:
+                    self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.connect_over_cdp(
+                    self._endpoint, timeout=DEFAULT_TIMEOUT
+                )
+            return self._browser
+
+    async def close(self) -> None:
+        # Disconnects and drops this worker's contexts; the broker keeps the browser running.
+        if self._browser and self._browser.is_connected():
+            await self._browser.close()
+        if self._playwright:
+            await self._playwright.stop()
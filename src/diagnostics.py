@@ -0,0 +1,235 @@
+"""Event-loop lag monitoring and on-demand profiling helpers."""
+from __future__ import annotations
+
+import asyncio
+import cProfile
+import io
+import logging
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+
+logger = logging.getLogger("unison-agent-vdi.diagnostics")
+
+LAG_BUCKETS_MS = (1, 5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000)
+PROFILE_MAX_SECONDS = float(os.environ.get("VDI_PROFILE_MAX_SECONDS", "30"))
+
+
+def loop_monitor_enabled() -> bool:
+    return os.environ.get("VDI_LOOP_MONITOR", "true").lower() == "true"
+
+
+class LagHistogram:
+    """Cumulative histogram of observed event-loop lag, in milliseconds."""
+
+    def __init__(self, buckets: tuple = LAG_BUCKETS_MS) -> None:
+        self.buckets = tuple(buckets)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def observe(self, lag_ms: float) -> None:
+        lag_ms = max(lag_ms, 0.0)
+        for idx, bound in enumerate(self.buckets):
+            if lag_ms <= bound:
+                self.counts[idx] += 1
+                break
+        else:
+            self.counts[-1] += 1
+        self.count += 1
+        self.total_ms += lag_ms
+        self.max_ms = max(self.max_ms, lag_ms)
+
+    def snapshot(self) -> Dict[str, object]:
+        labels = [f"le_{bound}" for bound in self.buckets] + ["le_inf"]
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0.0,
+            "max_ms": round(self.max_ms, 3),
+            "buckets": dict(zip(labels, self.counts)),
+        }
+
+
+def _format_frame_stack(frame, limit: int = 30) -> List[str]:
+    return [line.rstrip() for line in traceback.format_stack(frame, limit=limit)]
+
+
+class LoopLagMonitor:
+    """Measures event-loop scheduling lag and captures the loop's stack during stalls.
+
+    A coroutine sleeps for ``interval`` and records how late it woke up. A watchdog
+    thread watches the coroutine's heartbeat; if the loop stops turning for longer
+    than ``slow_threshold`` it snapshots the loop thread's stack, so the slow-callback
+    log points at the code that was actually blocking.
+    """
+
+    def __init__(self, interval: float = 0.25, slow_threshold: float = 0.1, history: int = 20) -> None:
+        self.interval = interval
+        self.slow_threshold = slow_threshold
+        self.histogram = LagHistogram()
+        self.slow_events: Deque[Dict[str, object]] = deque(maxlen=history)
+        self._heartbeat = time.monotonic()
+        self._stall_stack: Optional[List[str]] = None
+        self._loop_thread_id: Optional[int] = None
+        self._task: Optional[asyncio.Task] = None
+        self._watchdog: Optional[threading.Thread] = None
+        self._stop = threading.Event()
+
+    @classmethod
+    def from_env(cls) -> "LoopLagMonitor":
+        return cls(
+            interval=float(os.environ.get("VDI_LOOP_MONITOR_INTERVAL_MS", "250")) / 1000,
+            slow_threshold=float(os.environ.get("VDI_SLOW_CALLBACK_MS", "100")) / 1000,
+        )
+
+    @property
+    def loop_thread_id(self) -> Optional[int]:
+        return self._loop_thread_id
+
+    def start(self) -> None:
+        """Start monitoring the running loop. Must be called from the loop thread."""
+        if self._task is not None:
+            return
+        self._loop_thread_id = threading.get_ident()
+        self._heartbeat = time.monotonic()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._run(), name="vdi-loop-lag-monitor")
+        self._watchdog = threading.Thread(target=self._watch, name="vdi-loop-watchdog", daemon=True)
+        self._watchdog.start()
+
+    async def stop(self) -> None:
+        self._stop.set()
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+        if self._watchdog is not None:
+            self._watchdog.join(timeout=1.0)
+            self._watchdog = None
+
+    async def _run(self) -> None:
+        while True:
+            started = time.monotonic()
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            lag = now - started - self.interval
+            self._heartbeat = now
+            self.histogram.observe(lag * 1000)
+            if lag >= self.slow_threshold:
+                self._record_slow(lag)
+
+    def _record_slow(self, lag: float) -> None:
+        stack, self._stall_stack = self._stall_stack, None
+        event = {"lag_ms": round(lag * 1000, 3), "at": time.time(), "stack": stack or []}
+        self.slow_events.append(event)
+        if stack:
+            logger.warning("event loop blocked for %.1f ms; stack at stall:\n%s", lag * 1000, "\n".join(stack))
+        else:
+            logger.warning("event loop blocked for %.1f ms", lag * 1000)
+
+    def _watch(self) -> None:
+        poll = max(self.slow_threshold / 2, 0.01)
+        captured_for: Optional[float] = None
+        while not self._stop.wait(poll):
+            heartbeat = self._heartbeat
+            if captured_for == heartbeat:
+                continue
+            if time.monotonic() - heartbeat > self.interval + self.slow_threshold:
+                frame = sys._current_frames().get(self._loop_thread_id)
+                if frame is not None:
+                    self._stall_stack = _format_frame_stack(frame)
+                captured_for = heartbeat
+
+    def snapshot(self) -> Dict[str, object]:
+        return {
+            "running": self._task is not None,
+            "interval_ms": self.interval * 1000,
+            "slow_threshold_ms": self.slow_threshold * 1000,
+            "lag": self.histogram.snapshot(),
+            "slow_events": list(self.slow_events),
+        }
+
+
+def dump_tasks(stack_limit: int = 10) -> List[Dict[str, object]]:
+    """Return a description of every task on the running loop, with its await stack."""
+    tasks = []
+    for task in asyncio.all_tasks():
+        frames = task.get_stack(limit=stack_limit)
+        tasks.append(
+            {
+                "name": task.get_name(),
+                "done": task.done(),
+                "cancelled": task.cancelled(),
+                "coro": repr(task.get_coro()),
+                "stack": [f"{f.f_code.co_filename}:{f.f_lineno} in {f.f_code.co_name}" for f in frames],
+            }
+        )
+    tasks.sort(key=lambda item: item["name"])
+    return tasks
+
+
+_profile_lock = asyncio.Lock()
+
+PROFILE_SORT_KEYS = frozenset(key.value for key in pstats.SortKey) | frozenset(pstats.Stats.sort_arg_dict_default)
+
+
+def profile_busy() -> bool:
+    return _profile_lock.locked()
+
+
+async def profile_cprofile(seconds: float, sort: str = "cumulative", limit: int = 50) -> str:
+    """Profile everything the loop thread runs for ``seconds`` and return a pstats report."""
+    async with _profile_lock:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            await asyncio.sleep(seconds)
+        finally:
+            profiler.disable()
+    out = io.StringIO()
+    pstats.Stats(profiler, stream=out).sort_stats(sort).print_stats(limit)
+    return out.getvalue()
+
+
+def _sample(thread_id: int, seconds: float, interval: float, counts: Counter, stop: threading.Event) -> int:
+    deadline = time.monotonic() + seconds
+    samples = 0
+    while time.monotonic() < deadline and not stop.wait(interval):
+        frame = sys._current_frames().get(thread_id)
+        if frame is None:
+            continue
+        stack = []
+        while frame is not None:
+            stack.append(f"{frame.f_code.co_name} ({os.path.basename(frame.f_code.co_filename)}:{frame.f_lineno})")
+            frame = frame.f_back
+        counts[";".join(reversed(stack))] += 1
+        samples += 1
+    return samples
+
+
+async def profile_sampling(
+    seconds: float, interval: float = 0.005, limit: int = 50, thread_id: Optional[int] = None
+) -> Dict[str, object]:
+    """Sample the loop thread's stack from a helper thread; returns collapsed stacks."""
+    target = thread_id or threading.get_ident()
+    counts: Counter = Counter()
+    stop = threading.Event()
+    async with _profile_lock:
+        try:
+            samples = await asyncio.to_thread(_sample, target, seconds, interval, counts, stop)
+        finally:
+            stop.set()
+    return {
+        "samples": samples,
+        "interval_ms": interval * 1000,
+        "stacks": [{"stack": stack, "count": count} for stack, count in counts.most_common(limit)],
+    }
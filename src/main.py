@@ -13,8 +13,25 @@ from contextlib import asynccontextmanager
 from fastapi import Depends, FastAPI, HTTPException, Request
 from fastapi.responses import JSONResponse
 
-from .browser import BrowserRunner, FakeBrowserRunner, PlaywrightBrowserRunner
+from .browser import (
+    BrowserRunner,
+    FakeBrowserRunner,
+    PlaywrightBrowserRunner,
+    RemoteBrowserRunner,
+    broker_endpoints,
+)
+from .diagnostics import (
+    PROFILE_MAX_SECONDS,
+    PROFILE_SORT_KEYS,
+    LoopLagMonitor,
+    dump_tasks,
+    loop_monitor_enabled,
+    profile_busy,
+    profile_cprofile,
+    profile_sampling,
+)
 from .models import BrowseRequest, DownloadRequest, FormSubmitRequest, TaskResult
+from .session_state import SessionState, SessionStateStore, SessionStateUnavailable
 from .storage_client import StorageClient
 from .vpn import vpn_ip, vpn_ready
 
@@ -123,6 +140,29 @@ def get_storage_client() -> StorageClient:
     return app.state.storage_client
 
 
+def get_session_store() -> SessionStateStore:
+    return app.state.session_store
+
+
+async def _load_session(sessions: SessionStateStore, request: BrowseRequest) -> Optional[SessionState]:
+    try:
+        return await sessions.load(request.person_id, request.session_id, request.session_rev)
+    except SessionStateUnavailable:
+        raise HTTPException(status_code=503, detail="session_state_unavailable")
+
+
+async def _persist_session(
+    sessions: SessionStateStore, session: Optional[SessionState], result: TaskResult
+) -> None:
+    if session is None:
+        return
+    persisted = await sessions.save(session)
+    result.telemetry["session_source"] = session.source
+    result.telemetry["session_rev"] = str(session.rev)
+    if not persisted:
+        result.telemetry["session_persisted"] = "false"
+
+
 async def _ping(url: Optional[str]) -> bool:
     if not url:
         return True
@@ -143,6 +183,15 @@ async def _require_auth(request: Request) -> None:
         raise HTTPException(status_code=401, detail="unauthorized")
 
 
+async def _require_debug_auth(request: Request) -> None:
+    # Debug endpoints expose stacks and the profiler, so they always need a configured token.
+    if not VDI_SERVICE_TOKEN:
+        raise HTTPException(status_code=404, detail="not_found")
+    token = request.headers.get("Authorization", "").replace("Bearer ", "").strip()
+    if token != VDI_SERVICE_TOKEN:
+        raise HTTPException(status_code=401, detail="unauthorized")
+
+
 async def _require_vpn() -> None:
     ready = await vpn_ready()
     if not ready:
@@ -153,8 +202,11 @@ async def _require_vpn() -> None:
 async def lifespan(app: FastAPI):
     use_fake = os.environ.get("VDI_FAKE_BROWSER", "false").lower() == "true"
     globals()["USE_FAKE_BROWSER"] = use_fake
+    endpoints = broker_endpoints(os.environ.get("VDI_BROWSER_BROKER_URL"))
     if use_fake:
         runner: BrowserRunner = FakeBrowserRunner()
+    elif endpoints:
+        runner = RemoteBrowserRunner(endpoints)
     else:
         try:
             runner = PlaywrightBrowserRunner()
@@ -162,12 +214,18 @@ async def lifespan(app: FastAPI):
             runner = FakeBrowserRunner()
     app.state.browser_runner = runner
     app.state.storage_client = StorageClient(STORAGE_URL, STORAGE_TOKEN)
+    app.state.session_store = SessionStateStore(app.state.storage_client)
     resolved = _resolve_workspace_path()
     app.state.workspace_path = resolved
     globals()["VDI_WORKSPACE_PATH"] = resolved
+    monitor = LoopLagMonitor.from_env()
+    if loop_monitor_enabled():
+        monitor.start()
+    app.state.loop_monitor = monitor
     try:
         yield
     finally:
+        await monitor.stop()
         runner_ref: BrowserRunner = app.state.browser_runner
         if runner_ref:
             await runner_ref.close()
@@ -199,13 +257,16 @@ async def browse_task(
     request: BrowseRequest,
     browser: BrowserRunner = Depends(get_browser_runner),
     storage: StorageClient = Depends(get_storage_client),
+    sessions: SessionStateStore = Depends(get_session_store),
     _: None = Depends(_require_auth),
     __: None = Depends(_require_vpn),
 ) -> TaskResult:
     _enforce_domain_policy(str(request.url))
     workspace = _ensure_workspace(VDI_WORKSPACE_PATH, request.person_id, request.session_id)
     try:
-        result = await browser.browse(request, workspace)
+        session = await _load_session(sessions, request)
+        result = await browser.browse(request, workspace, session)
+        await _persist_session(sessions, session, result)
         exit_ip = await vpn_ip(VPN_IP_ECHO_URL)
         await _audit(storage, request.person_id, "browse", request.url, result.status)
         result.exit_ip = exit_ip
@@ -222,13 +283,16 @@ async def form_submit_task(
     request: FormSubmitRequest,
     browser: BrowserRunner = Depends(get_browser_runner),
     storage: StorageClient = Depends(get_storage_client),
+    sessions: SessionStateStore = Depends(get_session_store),
     _: None = Depends(_require_auth),
     __: None = Depends(_require_vpn),
 ) -> TaskResult:
     _enforce_domain_policy(str(request.url))
     workspace = _ensure_workspace(VDI_WORKSPACE_PATH, request.person_id, request.session_id)
     try:
-        result = await browser.submit_form(request, workspace)
+        session = await _load_session(sessions, request)
+        result = await browser.submit_form(request, workspace, session)
+        await _persist_session(sessions, session, result)
         exit_ip = await vpn_ip(VPN_IP_ECHO_URL)
         await _audit(storage, request.person_id, "form_submit", request.url, result.status)
         result.exit_ip = exit_ip
@@ -245,13 +309,16 @@ async def download_task(
     request: DownloadRequest,
     browser: BrowserRunner = Depends(get_browser_runner),
     storage: StorageClient = Depends(get_storage_client),
+    sessions: SessionStateStore = Depends(get_session_store),
     _: None = Depends(_require_auth),
     __: None = Depends(_require_vpn),
 ) -> TaskResult:
     _enforce_domain_policy(str(request.url))
     workspace = _ensure_workspace(VDI_WORKSPACE_PATH, request.person_id, request.session_id)
     try:
-        result = await browser.download(request, workspace)
+        session = await _load_session(sessions, request)
+        result = await browser.download(request, workspace, session)
+        await _persist_session(sessions, session, result)
         stored_ids = []
         for artifact in result.artifacts:
             stored = await storage.upload_file(
@@ -278,6 +345,45 @@ async def download_task(
             _cleanup_workspace(workspace)
 
 
+@app.get("/debug/loop")
+async def debug_loop(_: None = Depends(_require_debug_auth)) -> Dict[str, object]:
+    monitor: Optional[LoopLagMonitor] = getattr(app.state, "loop_monitor", None)
+    if monitor is None:
+        raise HTTPException(status_code=503, detail="loop_monitor_unavailable")
+    return monitor.snapshot()
+
+
+@app.get("/debug/tasks")
+async def debug_tasks(stack_limit: int = 10, _: None = Depends(_require_debug_auth)) -> Dict[str, object]:
+    tasks = dump_tasks(stack_limit=max(stack_limit, 0))
+    return {"count": len(tasks), "tasks": tasks}
+
+
+@app.get("/debug/profile")
+async def debug_profile(
+    seconds: float = 5.0,
+    mode: str = "cprofile",
+    sort: str = "cumulative",
+    limit: int = 50,
+    _: None = Depends(_require_debug_auth),
+) -> Dict[str, object]:
+    if mode not in ("cprofile", "sampling"):
+        raise HTTPException(status_code=400, detail="invalid_profile_mode")
+    if sort not in PROFILE_SORT_KEYS:
+        raise HTTPException(status_code=400, detail="invalid_profile_sort")
+    if not 0 < seconds <= PROFILE_MAX_SECONDS:
+        raise HTTPException(status_code=400, detail="invalid_profile_duration")
+    if profile_busy():
+        raise HTTPException(status_code=409, detail="profile_in_progress")
+    if mode == "sampling":
+        monitor: Optional[LoopLagMonitor] = getattr(app.state, "loop_monitor", None)
+        thread_id = monitor.loop_thread_id if monitor else None
+        result = await profile_sampling(seconds, limit=limit, thread_id=thread_id)
+        return {"mode": mode, "seconds": seconds, **result}
+    report = await profile_cprofile(seconds, sort=sort, limit=limit)
+    return {"mode": mode, "seconds": seconds, "report": report}
+
+
 @app.get("/")
 async def root() -> Dict[str, str]:
     return {"service": "unison-agent-vdi", "port": str(VDI_PORT)}
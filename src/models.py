@@ -3,7 +3,7 @@ from __future__ import annotations
 from enum import Enum
 from typing import Dict, List, Optional
 
-from pydantic import BaseModel, Field, HttpUrl
+from pydantic import BaseModel, Field, HttpUrl, model_validator
 
 
 class RiskLevel(str, Enum):
@@ -13,14 +13,34 @@ class RiskLevel(str, Enum):
 
 
 class BrowseAction(BaseModel):
+    fill_selector: Optional[str] = Field(None, description="Selector of an input to fill with `value`")
+    select_selector: Optional[str] = Field(None, description="Selector of a <select> to set to `value`")
+    value: Optional[str] = Field(None, description="Value for fill_selector/select_selector")
+    check_selector: Optional[str] = Field(None, description="Checkbox/radio selector to check")
+    uncheck_selector: Optional[str] = Field(None, description="Checkbox selector to uncheck")
     click_selector: Optional[str] = Field(None, description="CSS selector to click")
     wait_for: Optional[str] = Field(None, description="CSS selector to wait for after action")
+    wait_for_any: List[str] = Field(default_factory=list, description="Wait until any of these selectors appears")
+    wait_for_network_idle: bool = Field(False, description="Wait for the network to go idle")
+    assert_selector: Optional[str] = Field(None, description="Selector that must be visible (or contain assert_text)")
+    assert_text: Optional[str] = Field(None, description="Text the assert_selector element must contain")
+
+    @model_validator(mode="after")
+    def _check_targets(self) -> "BrowseAction":
+        if (self.fill_selector or self.select_selector) and self.value is None:
+            raise ValueError("value is required with fill_selector/select_selector")
+        if self.assert_text is not None and not self.assert_selector:
+            raise ValueError("assert_text requires assert_selector")
+        return self
 
 
 class BrowseRequest(BaseModel):
     person_id: str
     url: HttpUrl | str
     session_id: Optional[str] = Field(default=None, description="Session/workflow identifier")
+    session_rev: Optional[int] = Field(
+        default=None, description="Session state revision from the previous step; forces a reload if newer than local"
+    )
     wait_for: Optional[str] = Field(default=None, description="Selector to wait for after navigation")
     actions: List[BrowseAction] = Field(default_factory=list)
     headers: Optional[Dict[str, str]] = None
@@ -0,0 +1,158 @@
+"""Portable browser session state shared across VDI replicas via the storage service."""
+from __future__ import annotations
+
+import base64
+import copy
+import json
+import os
+import zlib
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+from urllib.parse import quote
+
+from .storage_client import StorageClient, StorageUnavailableError
+
+SESSION_STATE_VERSION = 1
+SESSION_CACHE_SIZE = int(os.environ.get("VDI_SESSION_CACHE_SIZE", "256"))
+
+
+def session_persistence_enabled() -> bool:
+    return os.environ.get("VDI_PERSIST_SESSIONS", "true").lower() == "true"
+
+
+def _canonical(state: Optional[Dict[str, Any]]) -> str:
+    return json.dumps(state or {}, separators=(",", ":"), sort_keys=True)
+
+
+def encode_state(storage_state: Dict[str, Any], rev: int) -> Dict[str, Any]:
+    """Pack a Playwright storage state into a versioned record; the state itself is zlib + base64 JSON."""
+    raw = json.dumps(
+        {"cookies": storage_state.get("cookies", []), "origins": storage_state.get("origins", [])},
+        separators=(",", ":"),
+    ).encode()
+    return {"v": SESSION_STATE_VERSION, "rev": rev, "state": base64.b64encode(zlib.compress(raw, 6)).decode()}
+
+
+def record_rev(record: Any) -> Optional[int]:
+    """Revision of a stored record, or ``None`` if this replica cannot read it (unknown version, bad rev)."""
+    if not isinstance(record, dict) or record.get("v") != SESSION_STATE_VERSION:
+        return None
+    rev = record.get("rev")
+    if not isinstance(rev, int) or isinstance(rev, bool) or rev < 0:
+        return None
+    return rev
+
+
+def decode_state(record: Any) -> Optional[tuple[Dict[str, Any], int]]:
+    """Unpack a record from ``encode_state``; returns ``None`` if it is corrupt or from another version."""
+    rev = record_rev(record)
+    if rev is None:
+        return None
+    try:
+        payload = json.loads(zlib.decompress(base64.b64decode(record["state"])))
+    except Exception:
+        return None
+    if not isinstance(payload, dict):
+        return None
+    return {"cookies": payload.get("cookies", []), "origins": payload.get("origins", [])}, rev
+
+
+class SessionStateUnavailable(Exception):
+    """Raised when the caller expects a session revision this replica cannot read."""
+
+
+@dataclass
+class SessionState:
+    """Browser storage state for one workflow step; runners read and replace ``storage_state``."""
+
+    key: str
+    storage_state: Optional[Dict[str, Any]] = None
+    rev: int = 0
+    source: str = "new"
+    baseline: str = field(default="", repr=False)
+
+    def changed(self) -> bool:
+        return _canonical(self.storage_state) != self.baseline
+
+
+class SessionStateStore:
+    """Loads and saves session state, preferring the copy already warm on this replica."""
+
+    def __init__(self, storage: StorageClient, max_local: int = SESSION_CACHE_SIZE) -> None:
+        self.storage = storage
+        self.max_local = max_local
+        self._local: "OrderedDict[str, tuple[Dict[str, Any], int]]" = OrderedDict()
+
+    @staticmethod
+    def session_key(person_id: str, session_id: str) -> str:
+        return quote(f"{person_id}:{session_id}", safe="")
+
+    def _remember(self, key: str, state: Dict[str, Any], rev: int) -> None:
+        self._local[key] = (state, rev)
+        self._local.move_to_end(key)
+        while len(self._local) > self.max_local:
+            self._local.popitem(last=False)
+
+    async def load(self, person_id: str, session_id: Optional[str], rev: Optional[int] = None) -> Optional[SessionState]:
+        """Return the session's state; a warm local copy is used unless the caller expects a newer ``rev``."""
+        if not session_id:
+            return None
+        key = self.session_key(person_id, session_id)
+        cached = self._local.get(key)
+        if cached is not None and (rev is None or cached[1] >= rev):
+            self._local.move_to_end(key)
+            state, cached_rev = copy.deepcopy(cached[0]), cached[1]
+            return SessionState(key=key, storage_state=state, rev=cached_rev, source="local", baseline=_canonical(state))
+        record = None
+        if session_persistence_enabled():
+            try:
+                record = await self.storage.get_session_state(key)
+            except StorageUnavailableError:
+                if rev:
+                    raise SessionStateUnavailable(f"session state rev {rev} unreadable")
+        decoded = decode_state(record) if record is not None else None
+        if record is not None and decoded is None:
+            # Present but unreadable (newer version or corrupt): starting empty would overwrite it.
+            raise SessionStateUnavailable("stored session state unreadable")
+        if decoded is None:
+            if rev:
+                # Starting empty here would overwrite the caller's newer state on save.
+                raise SessionStateUnavailable(f"session state rev {rev} not found")
+            return SessionState(key=key, baseline=_canonical(None))
+        state, stored_rev = decoded
+        if rev is not None and stored_rev < rev:
+            raise SessionStateUnavailable(f"session state rev {rev} newer than stored rev {stored_rev}")
+        self._remember(key, copy.deepcopy(state), stored_rev)
+        return SessionState(key=key, storage_state=state, rev=stored_rev, source="remote", baseline=_canonical(state))
+
+    async def _remote_rev(self, key: str) -> Optional[int]:
+        """Revision currently in storage (0 when absent); ``None`` when it cannot be read or understood."""
+        try:
+            record = await self.storage.get_session_state(key)
+        except StorageUnavailableError:
+            return None
+        return 0 if record is None else record_rev(record)
+
+    async def save(self, session: Optional[SessionState]) -> bool:
+        """Persist the state if the step changed it; returns ``False`` when nothing could be written.
+
+        Storage is re-read first and the write is skipped if another replica already stored
+        a newer revision, so a stale warm copy never rolls the session back. The KV API has
+        no conditional put, so two replicas racing on the same revision can still collide.
+        """
+        if session is None or session.storage_state is None or not session.changed():
+            return True
+        if session_persistence_enabled():
+            remote_rev = await self._remote_rev(session.key)
+            if remote_rev is None or remote_rev > session.rev:
+                self._local.pop(session.key, None)
+                return False
+            record = encode_state(session.storage_state, session.rev + 1)
+            if not await self.storage.put_session_state(session.key, record):
+                self._local.pop(session.key, None)
+                return False
+        session.rev += 1
+        session.baseline = _canonical(session.storage_state)
+        self._remember(session.key, copy.deepcopy(session.storage_state), session.rev)
+        return True
@@ -4,11 +4,15 @@ import base64
 import os
 import uuid
 from pathlib import Path
-from typing import Dict, Optional
+from typing import Any, Dict, Optional
 
 import httpx
 
 
+class StorageUnavailableError(Exception):
+    """Raised when the storage service could not be read (transport error or 5xx)."""
+
+
 class StorageClient:
     def __init__(self, base_url: Optional[str], token: Optional[str]) -> None:
         self.base_url = base_url.rstrip("/") if base_url else None
@@ -40,6 +44,38 @@ class StorageClient:
             resp.raise_for_status()
         return artifact_id
 
+    async def get_session_state(self, session_key: str) -> Optional[Any]:
+        """Fetches the stored session record; ``None`` means no state is stored.
+
+        Raises ``StorageUnavailableError`` when storage cannot answer, so callers never
+        mistake an outage for an empty session.
+        """
+        if not self.base_url:
+            return None
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            try:
+                resp = await client.get(f"{self.base_url}/kv/vdi_sessions/{session_key}", headers=self._headers())
+                if resp.status_code == 404:
+                    return None
+                resp.raise_for_status()
+                return resp.json().get("value")
+            except Exception as exc:
+                raise StorageUnavailableError(str(exc)) from exc
+
+    async def put_session_state(self, session_key: str, record: Dict[str, Any]) -> bool:
+        if not self.base_url:
+            return True
+        payload = {"value": record}
+        async with httpx.AsyncClient(timeout=5.0) as client:
+            try:
+                resp = await client.put(
+                    f"{self.base_url}/kv/vdi_sessions/{session_key}", json=payload, headers=self._headers()
+                )
+                resp.raise_for_status()
+            except Exception:
+                return False
+        return True
+
     async def audit(self, event: Dict[str, str]) -> None:
         if not self.base_url:
             return
@@ -0,0 +1,216 @@
+import asyncio
+import json
+
+import pytest
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+from pydantic import ValidationError
+
+from src.actions import (
+    _FILL_SCRIPT,
+    ActionAssertionError,
+    ActionExecutor,
+    plan_batches,
+    steps_from_actions,
+    steps_from_form,
+)
+from src.models import BrowseAction, FormField
+
+
+class RecordingPage:
+    """Minimal stand-in for a Playwright page that records driver calls."""
+
+    def __init__(self, unsupported=(), text="", visible=True, waits=None):
+        self.calls = []
+        self.writes = []
+        self.unsupported = set(unsupported)
+        self.text = text
+        self.visible = visible
+        self.waits = waits or {}
+        self.cancelled = []
+
+    async def evaluate(self, script, items):
+        # Mirrors _FILL_SCRIPT: applies items in order and stops at the first unsupported one.
+        self.calls.append(("evaluate", [item[0] for item in items]))
+        for applied, (selector, value, _) in enumerate(items):
+            if (selector, value) in self.unsupported:
+                return applied
+            self.writes.append((selector, value))
+        return len(items)
+
+    async def fill(self, selector, value):
+        self.calls.append(("fill", selector))
+        self.writes.append((selector, value))
+
+    async def select_option(self, selector, value):
+        self.calls.append(("select", selector))
+        self.writes.append((selector, value))
+
+    async def wait_for_selector(self, selector):
+        self.calls.append(("wait", selector))
+        behaviour = self.waits.get(selector)
+        if behaviour == "fail":
+            await asyncio.sleep(0)
+            raise PlaywrightTimeoutError(f"timed out waiting for {selector}")
+        if behaviour == "hang":
+            try:
+                await asyncio.sleep(3600)
+            except asyncio.CancelledError:
+                self.cancelled.append(selector)
+                raise
+
+    async def click(self, selector):
+        self.calls.append(("click", selector))
+
+    def locator(self, selector):
+        page = self
+
+        class _Locator:
+            first = None
+
+            async def wait_for(self, state="visible", timeout=None):
+                if not page.visible:
+                    raise PlaywrightTimeoutError(f"{selector} not visible")
+
+            async def inner_text(self, timeout=None):
+                return page.text
+
+        loc = _Locator()
+        loc.first = loc
+        return loc
+
+
+def test_plan_batches_groups_fills_and_waits():
+    steps = steps_from_form(
+        [
+            FormField(selector="#a", value="1"),
+            FormField(selector="#b", value="2", type="select"),
+            FormField(selector="#c", value="on", type="checkbox"),
+            FormField(selector="#d", value="3"),
+        ]
+    ) + steps_from_actions([BrowseAction(wait_for="#x"), BrowseAction(wait_for="#y", click_selector="#go")])
+    kinds = [(kind, len(batch)) for kind, batch in plan_batches(steps)]
+    assert kinds == [("fill", 2), ("check", 1), ("fill", 1), ("wait", 1), ("click", 1), ("wait", 1)]
+
+
+def test_executor_fills_in_one_round_trip_with_fallback():
+    page = RecordingPage(unsupported=[("text=Name", "2")])
+    executor = ActionExecutor(page)
+    steps = steps_from_form([FormField(selector="#a", value="1"), FormField(selector="text=Name", value="2")])
+    asyncio.run(executor.run(steps, label="form"))
+    assert page.calls == [("evaluate", ["#a", "text=Name"]), ("fill", "text=Name")]
+    telemetry = executor.telemetry()
+    assert telemetry["action_batches"] == "1"
+    assert json.loads(telemetry["action_timings"])[0]["steps"] == [0, 1]
+
+
+def test_executor_keeps_field_order_around_fallbacks():
+    page = RecordingPage(unsupported=[("#qty", "3"), ("#choice", "missing")])
+    executor = ActionExecutor(page)
+    steps = steps_from_form(
+        [
+            FormField(selector="#qty", value="3"),
+            FormField(selector="#note", value="gift"),
+            FormField(selector="#choice", value="b", type="select"),
+            FormField(selector="#choice", value="missing", type="select"),
+            FormField(selector="#name", value="Ada"),
+        ]
+    )
+    asyncio.run(executor.run(steps, label="form"))
+    assert page.writes == [("#qty", "3"), ("#note", "gift"), ("#choice", "b"), ("#choice", "missing"), ("#name", "Ada")]
+    assert page.calls == [
+        ("evaluate", ["#qty", "#note", "#choice", "#choice", "#name"]),
+        ("fill", "#qty"),
+        ("evaluate", ["#note", "#choice", "#choice", "#name"]),
+        ("select", "#choice"),
+        ("evaluate", ["#name"]),
+    ]
+
+
+def test_browse_action_requires_values_for_targets():
+    with pytest.raises(ValidationError):
+        BrowseAction(fill_selector="#name")
+    with pytest.raises(ValidationError):
+        BrowseAction(select_selector="#choice")
+    with pytest.raises(ValidationError):
+        BrowseAction(assert_text="Welcome")
+    assert BrowseAction(fill_selector="#name", value="").value == ""
+
+
+def test_executor_assertion_failure():
+    page = RecordingPage(text="Welcome back")
+    executor = ActionExecutor(page)
+    asyncio.run(executor.run(steps_from_actions([BrowseAction(assert_selector="h1", assert_text="Welcome")])))
+    with pytest.raises(ActionAssertionError):
+        asyncio.run(executor.run(steps_from_actions([BrowseAction(assert_selector="h1", assert_text="Goodbye")])))
+
+
+def test_executor_assertion_timeout_is_assertion_failure():
+    executor = ActionExecutor(RecordingPage(visible=False))
+    with pytest.raises(ActionAssertionError):
+        asyncio.run(executor.run(steps_from_actions([BrowseAction(assert_selector="h1", assert_text="Welcome")])))
+    with pytest.raises(ActionAssertionError):
+        asyncio.run(executor.run(steps_from_actions([BrowseAction(assert_selector="h1")])))
+
+
+def test_failed_wait_cancels_sibling_waits():
+    page = RecordingPage(waits={"#slow": "hang", "#broken": "fail"})
+    executor = ActionExecutor(page)
+    steps = steps_from_actions([BrowseAction(wait_for="#slow"), BrowseAction(wait_for="#broken")])
+    with pytest.raises(PlaywrightTimeoutError):
+        asyncio.run(executor.run(steps))
+    assert page.cancelled == ["#slow"]
+
+
+FILL_FIXTURE = """
+<input id="text" type="text">
+<input id="email" type="email">
+<textarea id="area"></textarea>
+<select id="choice"><option value="a">A</option><option value="b">B</option></select>
+<input id="hidden" type="hidden">
+<input id="styled-hidden" type="text" style="display:none">
+<input id="box" type="checkbox">
+<input id="num" type="number">
+<input id="file" type="file">
+<input id="disabled" type="text" disabled>
+"""
+
+
+def test_fill_script_only_sets_visible_text_controls():
+    async def scenario():
+        from playwright.async_api import async_playwright
+
+        async with async_playwright() as playwright:
+            try:
+                browser = await playwright.chromium.launch(headless=True)
+            except Exception as exc:
+                pytest.skip(f"chromium unavailable: {exc}")
+            page = await browser.new_page()
+            await page.set_content(FILL_FIXTURE)
+            supported = [
+                ["#text", "hello", "fill"],
+                ["#email", "a@example.com", "fill"],
+                ["#area", "notes", "fill"],
+                ["#choice", "b", "select"],
+            ]
+            unsupported = [
+                ["#choice", "missing", "select"],
+                ["#hidden", "x", "fill"],
+                ["#styled-hidden", "x", "fill"],
+                ["#box", "on", "fill"],
+                ["#num", "abc", "fill"],
+                ["#file", "x", "fill"],
+                ["#disabled", "x", "fill"],
+                ["text=Name", "x", "fill"],
+            ]
+            applied = await page.evaluate(_FILL_SCRIPT, supported + unsupported + [["#text", "late", "fill"]])
+            stops = [await page.evaluate(_FILL_SCRIPT, [item]) for item in unsupported]
+            values = await page.evaluate(
+                "() => ['#text', '#email', '#area', '#choice'].map((s) => document.querySelector(s).value)"
+            )
+            await browser.close()
+            return applied, stops, values
+
+    applied, stops, values = asyncio.run(scenario())
+    assert applied == 4
+    assert stops == [0] * 8
+    assert values == ["hello", "a@example.com", "notes", "b"]
@@ -0,0 +1,108 @@
+import asyncio
+
+import pytest
+
+import src.broker as broker_module
+from src.browser import RemoteBrowserRunner, broker_endpoints
+from src.broker import BrowserBroker, broker_args
+
+
+def test_broker_endpoints_parse_comma_list():
+    assert broker_endpoints(" http://127.0.0.1:9222, ,http://127.0.0.1:9223 ") == [
+        "http://127.0.0.1:9222",
+        "http://127.0.0.1:9223",
+    ]
+    assert broker_endpoints(None) == []
+
+
+def test_broker_exposes_one_cdp_port_per_browser():
+    broker = BrowserBroker(host="127.0.0.1", port=9300, size=2)
+    assert broker.endpoints() == ["http://127.0.0.1:9300", "http://127.0.0.1:9301"]
+    assert "--remote-debugging-port=9301" in broker_args("127.0.0.1", 9301)
+
+
+def test_remote_runner_requires_endpoint():
+    with pytest.raises(ValueError):
+        RemoteBrowserRunner([])
+    runner = RemoteBrowserRunner(["http://127.0.0.1:9222"])
+    assert runner._endpoint == "http://127.0.0.1:9222"
+
+
+def test_broker_refuses_routable_host():
+    with pytest.raises(ValueError):
+        BrowserBroker(host="0.0.0.0")
+    with pytest.raises(ValueError):
+        BrowserBroker(host="10.0.0.5")
+    assert BrowserBroker(host="localhost").endpoints() == ["http://localhost:9222"]
+
+
+class FlakyChromium:
+    def __init__(self, failures):
+        self.failures = failures
+        self.attempts = 0
+
+    async def launch(self, **kwargs):
+        self.attempts += 1
+        if self.attempts <= self.failures:
+            raise RuntimeError("launch failed")
+        return FakeBrowser()
+
+
+class FakeBrowser:
+    def on(self, event, callback):
+        pass
+
+
+def test_broker_restart_retries_with_backoff(monkeypatch):
+    monkeypatch.setattr(broker_module, "RESTART_DELAY_SECONDS", 0.001)
+
+    async def scenario():
+        broker = BrowserBroker(size=1)
+        chromium = FlakyChromium(failures=2)
+        broker._playwright = type("FakePlaywright", (), {"chromium": chromium})()
+        await broker._restart(0)
+        return broker, chromium
+
+    broker, chromium = asyncio.run(scenario())
+    assert chromium.attempts == 3
+    assert broker._browsers[0] is not None
+
+
+class CdpBrowser:
+    def __init__(self):
+        self.connected = True
+
+    def is_connected(self):
+        return self.connected
+
+
+class CdpChromium:
+    def __init__(self):
+        self.connects = []
+        self.browsers = []
+
+    async def connect_over_cdp(self, endpoint, timeout=None):
+        self.connects.append(endpoint)
+        browser = CdpBrowser()
+        self.browsers.append(browser)
+        return browser
+
+
+def test_remote_runner_reconnects_after_broker_restart():
+    async def scenario():
+        runner = RemoteBrowserRunner(["http://127.0.0.1:9222"])
+        chromium = CdpChromium()
+        playwright = type("FakePlaywright", (), {"chromium": chromium})()
+        runner._playwright = playwright
+
+        first = await runner._ensure_browser()
+        assert await runner._ensure_browser() is first
+        assert chromium.connects == ["http://127.0.0.1:9222"]
+
+        first.connected = False
+        second = await runner._ensure_browser()
+        assert second is not first
+        assert runner._playwright is playwright
+        assert chromium.connects == ["http://127.0.0.1:9222", "http://127.0.0.1:9222"]
+
+    asyncio.run(scenario())
@@ -0,0 +1,115 @@
+import os
+
+os.environ.setdefault("VDI_FAKE_BROWSER", "true")
+os.environ.setdefault("VDI_REQUIRE_AUTH", "false")
+os.environ.setdefault("VDI_REQUIRE_VPN", "false")
+os.environ.setdefault("VDI_WORKSPACE_PATH", "/tmp/vdi-workspace")
+
+import asyncio  # noqa: E402
+import time  # noqa: E402
+
+import pytest  # noqa: E402
+from fastapi.testclient import TestClient  # noqa: E402
+
+import src.main as main  # noqa: E402
+from src.diagnostics import LagHistogram, LoopLagMonitor  # noqa: E402
+from src.main import app  # noqa: E402
+
+DEBUG_TOKEN = "debug-token"
+AUTH = {"Authorization": f"Bearer {DEBUG_TOKEN}"}
+
+
+@pytest.fixture
+def debug_token(monkeypatch):
+    monkeypatch.setattr(main, "VDI_SERVICE_TOKEN", DEBUG_TOKEN)
+
+
+def test_lag_histogram_buckets_observations():
+    histogram = LagHistogram(buckets=(10, 100))
+    histogram.observe(5)
+    histogram.observe(50)
+    histogram.observe(500)
+    snap = histogram.snapshot()
+    assert snap["count"] == 3
+    assert snap["max_ms"] == 500
+    assert snap["buckets"] == {"le_10": 1, "le_100": 1, "le_inf": 1}
+
+
+def _block_event_loop():
+    time.sleep(0.3)
+
+
+def test_loop_monitor_records_stall_with_blocking_stack():
+    async def scenario():
+        monitor = LoopLagMonitor(interval=0.02, slow_threshold=0.05)
+        monitor.start()
+        try:
+            await asyncio.sleep(0.05)
+            _block_event_loop()
+            await asyncio.sleep(0.1)
+        finally:
+            await monitor.stop()
+        return monitor
+
+    monitor = asyncio.run(scenario())
+    assert monitor.slow_events, "expected a slow event"
+    event = monitor.slow_events[-1]
+    assert event["lag_ms"] >= 50
+    assert any("_block_event_loop" in line for line in event["stack"])
+
+
+def test_debug_endpoints_hidden_without_configured_token(monkeypatch):
+    monkeypatch.setattr(main, "VDI_SERVICE_TOKEN", None)
+    with TestClient(app) as client:
+        assert client.get("/debug/tasks").status_code == 404
+        assert client.get("/debug/profile", params={"seconds": 0.05}).status_code == 404
+
+
+def test_debug_endpoints_require_token(debug_token):
+    with TestClient(app) as client:
+        assert client.get("/debug/loop").status_code == 401
+        assert client.get("/debug/loop", headers={"Authorization": "Bearer wrong"}).status_code == 401
+
+
+def test_debug_loop_reports_monitor_state(debug_token):
+    with TestClient(app) as client:
+        resp = client.get("/debug/loop", headers=AUTH)
+        assert resp.status_code == 200
+        body = resp.json()
+        assert body["running"] is True
+        assert "buckets" in body["lag"]
+
+
+def test_debug_tasks_lists_monitor_task(debug_token):
+    with TestClient(app) as client:
+        resp = client.get("/debug/tasks", headers=AUTH)
+        assert resp.status_code == 200
+        names = [task["name"] for task in resp.json()["tasks"]]
+        assert "vdi-loop-lag-monitor" in names
+
+
+def test_debug_profile_modes(debug_token):
+    with TestClient(app) as client:
+        resp = client.get("/debug/profile", params={"seconds": 0.05}, headers=AUTH)
+        assert resp.status_code == 200
+        assert "function calls" in resp.json()["report"]
+
+        resp = client.get("/debug/profile", params={"seconds": 0.05, "mode": "sampling"}, headers=AUTH)
+        assert resp.status_code == 200
+        assert resp.json()["samples"] >= 0
+
+        resp = client.get("/debug/profile", params={"seconds": 0.05, "mode": "bogus"}, headers=AUTH)
+        assert resp.status_code == 400
+
+        for mode in ("cprofile", "sampling"):
+            resp = client.get("/debug/profile", params={"seconds": "nan", "mode": mode}, headers=AUTH)
+            assert resp.status_code == 400
+
+
+def test_debug_profile_rejects_unknown_sort_before_profiling(debug_token):
+    with TestClient(app) as client:
+        resp = client.get(
+            "/debug/profile", params={"seconds": main.PROFILE_MAX_SECONDS, "sort": "bogus"}, headers=AUTH
+        )
+        assert resp.status_code == 400
+        assert resp.json()["detail"] == "invalid_profile_sort"
@@ -0,0 +1,165 @@
+import asyncio
+
+import pytest
+
+from src.session_state import SessionStateStore, SessionStateUnavailable, decode_state, encode_state
+from src.storage_client import StorageClient, StorageUnavailableError
+
+
+class MemoryStorage(StorageClient):
+    def __init__(self) -> None:
+        super().__init__("http://storage.invalid", None)
+        self.kv = {}
+        self.unavailable = False
+
+    async def get_session_state(self, session_key):
+        if self.unavailable:
+            raise StorageUnavailableError("storage down")
+        return self.kv.get(session_key)
+
+    async def put_session_state(self, session_key, blob):
+        self.kv[session_key] = blob
+        return True
+
+
+STATE = {"cookies": [{"name": "sid", "value": "abc", "domain": "example.com"}], "origins": []}
+
+
+def test_encode_decode_round_trip():
+    record = encode_state(STATE, rev=3)
+    assert record["v"] == 1 and record["rev"] == 3
+    assert decode_state(record) == (STATE, 3)
+    assert decode_state("not-a-record") is None
+    assert decode_state({**record, "rev": "3"}) is None
+    assert decode_state({**record, "state": "not-base64!"}) is None
+
+
+def test_state_rehydrates_on_another_replica():
+    async def scenario():
+        storage = MemoryStorage()
+        node_a, node_b = SessionStateStore(storage), SessionStateStore(storage)
+
+        first = await node_a.load("person-1", "session-1")
+        assert first.source == "new"
+        first.storage_state = STATE
+        assert await node_a.save(first)
+        assert first.rev == 1
+
+        second = await node_b.load("person-1", "session-1")
+        assert second.source == "remote"
+        assert second.storage_state == STATE
+
+        warm = await node_a.load("person-1", "session-1")
+        assert warm.source == "local"
+
+        second.storage_state = {"cookies": [], "origins": []}
+        await node_b.save(second)
+        stale = await node_a.load("person-1", "session-1", rev=second.rev)
+        assert stale.source == "remote"
+        assert stale.rev == 2
+
+    asyncio.run(scenario())
+
+
+def test_unchanged_state_is_not_rewritten():
+    async def scenario():
+        storage = MemoryStorage()
+        store = SessionStateStore(storage)
+        session = await store.load("person-1", "session-2")
+        session.storage_state = STATE
+        await store.save(session)
+        storage.kv.clear()
+        again = await store.load("person-1", "session-2")
+        await store.save(again)
+        assert storage.kv == {}
+        assert again.rev == 1
+
+    asyncio.run(scenario())
+
+
+def test_stale_warm_copy_does_not_overwrite_newer_remote_state():
+    async def scenario():
+        storage = MemoryStorage()
+        node_a, node_b = SessionStateStore(storage), SessionStateStore(storage)
+
+        first = await node_a.load("person-1", "session-3")
+        first.storage_state = STATE
+        await node_a.save(first)
+
+        for value in ("b1", "b2"):
+            step = await node_b.load("person-1", "session-3")
+            step.storage_state = {"cookies": [{"name": "sid", "value": value}], "origins": []}
+            assert await node_b.save(step)
+        assert decode_state(storage.kv[step.key])[1] == 3
+
+        stale = await node_a.load("person-1", "session-3")
+        assert stale.source == "local" and stale.rev == 1
+        stale.storage_state = {"cookies": [], "origins": []}
+        assert await node_a.save(stale) is False
+        assert decode_state(storage.kv[step.key]) == (step.storage_state, 3)
+
+        fresh = await node_a.load("person-1", "session-3")
+        assert fresh.source == "remote" and fresh.rev == 3
+
+    asyncio.run(scenario())
+
+
+def test_storage_outage_never_resets_expected_revision():
+    async def scenario():
+        storage = MemoryStorage()
+        writer = SessionStateStore(storage)
+        session = await writer.load("person-1", "session-4")
+        for value in ("one", "two"):
+            session.storage_state = {"cookies": [{"name": "sid", "value": value}], "origins": []}
+            await writer.save(session)
+        stored = storage.kv[session.key]
+
+        storage.unavailable = True
+        cold = SessionStateStore(storage)
+        with pytest.raises(SessionStateUnavailable):
+            await cold.load("person-1", "session-4", rev=2)
+
+        # Without an expected revision the step may start empty, but must not write over storage.
+        blank = await cold.load("person-1", "session-4")
+        blank.storage_state = {"cookies": [], "origins": []}
+        assert await cold.save(blank) is False
+        storage.unavailable = False
+        assert await cold.save(blank) is False
+        assert storage.kv[session.key] == stored
+
+        storage.kv.clear()
+        with pytest.raises(SessionStateUnavailable):
+            await cold.load("person-1", "session-4", rev=2)
+
+    asyncio.run(scenario())
+
+
+@pytest.mark.parametrize(
+    "record",
+    [
+        {"v": 2, "rev": 7, "state": "future-format"},
+        {**encode_state(STATE, rev=4), "state": "corrupt"},
+        {**encode_state(STATE, rev=4), "rev": "four"},
+        "not-a-record",
+    ],
+    ids=["unknown-version", "corrupt-state", "non-int-rev", "non-dict"],
+)
+def test_unreadable_record_is_never_overwritten(record):
+    async def scenario():
+        storage = MemoryStorage()
+        store = SessionStateStore(storage)
+        key = store.session_key("person-1", "session-5")
+        storage.kv[key] = record
+
+        with pytest.raises(SessionStateUnavailable):
+            await store.load("person-1", "session-5")
+        with pytest.raises(SessionStateUnavailable):
+            await store.load("person-1", "session-5", rev=1)
+
+        # A replica with a stale warm copy must not write over it either.
+        stale = await SessionStateStore(MemoryStorage()).load("person-1", "session-5")
+        stale.storage_state = STATE
+        assert await store.save(stale) is False
+        assert storage.kv[key] == record
+
+    asyncio.run(scenario())
@@ -10,6 +10,8 @@ from pathlib import Path
 from fastapi.testclient import TestClient  # noqa: E402
 
 from src.main import app  # noqa: E402
+from src.session_state import SessionStateStore  # noqa: E402
+from src.storage_client import StorageClient  # noqa: E402
 
 
 def test_browse_fake_runner():
@@ -116,3 +118,59 @@ def test_workspace_cleanup_removes_session_workspace_and_clears_artifacts():
         assert body["artifacts"] == []
         assert body["telemetry"]["workspace_cleaned"] == "true"
     assert not workspace.exists()
+
+
+class RecordingSessionStore(SessionStateStore):
+    def __init__(self):
+        super().__init__(StorageClient(None, None))
+        self.loads = []
+
+    async def load(self, person_id, session_id, rev=None):
+        self.loads.append((person_id, session_id, rev))
+        return await super().load(person_id, session_id, rev)
+
+
+def test_session_state_telemetry_and_rev_round_trip():
+    os.environ.pop("VDI_DOMAIN_ALLOWLIST", None)
+    os.environ.pop("VDI_DOMAIN_DENYLIST", None)
+    with TestClient(app) as client:
+        store = RecordingSessionStore()
+        app.state.session_store = store
+        payload = {"person_id": "person-7", "session_id": "session-rev-1", "url": "https://example.com"}
+
+        first = client.post("/tasks/browse", json=payload)
+        assert first.status_code == 200
+        telemetry = first.json()["telemetry"]
+        assert telemetry["session_source"] == "new"
+        assert telemetry["session_rev"] == "1"
+        assert "session_persisted" not in telemetry
+
+        second = client.post("/tasks/form-submit", json={**payload, "session_rev": 1})
+        assert second.status_code == 200
+        assert second.json()["telemetry"]["session_source"] == "local"
+        assert second.json()["telemetry"]["session_rev"] == "1"
+
+        ahead = client.post("/tasks/browse", json={**payload, "session_rev": 5})
+        assert ahead.status_code == 503
+        assert ahead.json()["detail"] == "session_state_unavailable"
+
+        assert store.loads == [
+            ("person-7", "session-rev-1", None),
+            ("person-7", "session-rev-1", 1),
+            ("person-7", "session-rev-1", 5),
+        ]
+
+
+def test_browse_rejects_fill_action_without_value():
+    os.environ.pop("VDI_DOMAIN_ALLOWLIST", None)
+    os.environ.pop("VDI_DOMAIN_DENYLIST", None)
+    with TestClient(app) as client:
+        resp = client.post(
+            "/tasks/browse",
+            json={
+                "person_id": "person-8",
+                "url": "https://example.com",
+                "actions": [{"fill_selector": "#name"}],
+            },
+        )
+        assert resp.status_code == 422